@@ -1,8 +1,14 @@
 
 from spotify_analysis.src.data.streaming_history import StreamingHistory
+from spotify_analysis.src.data.shared_streaming_history import (
+    SharedDatasetStore,
+    SharedStreamingHistory,
+)
 from spotify_analysis.src.analysis.streaming_history_analyser import StreamingHistoryAnalyser
 
 __all__ = [
+    "SharedDatasetStore",
+    "SharedStreamingHistory",
     "StreamingHistory",
     "StreamingHistoryAnalyser",
 ]
\ No newline at end of file
@@ -1,5 +1,7 @@
+from typing import Dict, Tuple
 import datetime
 
+import polars as pl
 import streamlit as st
 
 from spotify_analysis.src.analysis.streaming_history_analyser import (
@@ -8,14 +10,42 @@ from spotify_analysis.src.analysis.streaming_history_analyser import (
 from spotify_analysis.src.data.streaming_history import (
     StreamingHistory
 )
+from spotify_analysis.src.data.shared_streaming_history import (
+    SharedDatasetStore,
+    SharedStreamingHistory,
+    get_dataset_key,
+)
 
 spotify_download_link = "https://www.spotify.com/account/privacy/"
 
-@st.cache_data
+@st.cache_resource
+def get_shared_dataset_store() -> SharedDatasetStore:
+    # Sweep datasets left behind by server processes that were killed.
+    return SharedDatasetStore().prune()
+
+# Evicted handles are released by their finalizer once no session still uses
+# them, so datasets nobody is viewing are removed from the store.
+@st.cache_resource(max_entries=8, ttl=datetime.timedelta(hours=1))
+def attach_stream_history(
+    dataset_key: str,
+    _zip_path: st.runtime.uploaded_file_manager.UploadedFile,
+) -> SharedStreamingHistory:
+    # Cached as a resource so every session in this process shares one
+    # memory-mapped handle; other server processes attach to the same files.
+    def build() -> Tuple[StreamingHistory, Dict[str, pl.DataFrame]]:
+        stream_history = StreamingHistory(_zip_path).read_data().clean_data()
+        return stream_history, StreamingHistoryAnalyser(stream_history).get_shareable_aggregates()
+    
+    return get_shared_dataset_store().attach(dataset_key, build)
+
 def read_stream_history(
     zip_path: st.runtime.uploaded_file_manager.UploadedFile,
 ) -> StreamingHistory:
-    return StreamingHistory(zip_path).read_data().clean_data()
+    dataset_key = get_dataset_key(
+        zip_path.getvalue(),
+        StreamingHistoryAnalyser.SHAREABLE_AGGREGATES,
+    )
+    return attach_stream_history(dataset_key, zip_path)
 
 def get_data() -> StreamingHistory:
     # Upload the zip file
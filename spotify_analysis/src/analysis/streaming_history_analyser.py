@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Tuple, TYPE_CHECKING
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
 import datetime
 import calendar
 
@@ -21,6 +21,12 @@ def get_wrapped_range(year: int) -> pl.Expr:
 
 
 class StreamingHistoryAnalyser:
+    SHAREABLE_AGGREGATES: Tuple[str, ...] = (
+        "daily_play_counts",
+        "daily_artist_play_counts",
+        "daily_song_play_counts",
+    )
+    
     def __init__(self, SteamHistory: StreamingHistory):
         self._stream_history = SteamHistory
         self.cleaned_data: pl.DataFrame = SteamHistory.cleaned_data
@@ -28,6 +34,24 @@ class StreamingHistoryAnalyser:
         self.min_year: int = min(self.years)
         self.max_year: int = max(self.years)
     
+    def _get_shared_aggregate(self, name: str, year: int) -> Optional[pl.DataFrame]:
+        """Returns an aggregate published with a shared dataset, if one covers ``year``."""
+        if year is not None:
+            return None
+        return self._stream_history.aggregates.get(name)
+    
+    def get_shareable_aggregates(self) -> Dict[str, pl.DataFrame]:
+        """
+        Computes the all-years aggregates worth publishing with a shared dataset.
+
+        Returns:
+            Dict[str, pl.DataFrame]: The aggregates by name, for ``SharedDatasetStore.publish``.
+        """
+        return {
+            name: getattr(self, f"get_{name}")()
+            for name in self.SHAREABLE_AGGREGATES
+        }
+    
     def get_cleaned_data(self, year: int) -> pl.DataFrame:
         if isinstance(year, int):
             return (
@@ -87,6 +111,9 @@ class StreamingHistoryAnalyser:
         )
     
     def get_daily_play_counts(self, year: int = None) -> pl.DataFrame:
+        shared = self._get_shared_aggregate("daily_play_counts", year)
+        if shared is not None:
+            return shared
         return (
             self.get_cleaned_data(year)
             .select([
@@ -105,6 +132,9 @@ class StreamingHistoryAnalyser:
         )
     
     def get_daily_artist_play_counts(self, year: int = None) -> pl.DataFrame:
+        shared = self._get_shared_aggregate("daily_artist_play_counts", year)
+        if shared is not None:
+            return shared
         return (
             self.get_cleaned_data(year)
             .select([
@@ -154,6 +184,9 @@ class StreamingHistoryAnalyser:
                 - 'master_metadata_album_artist_name' (pl.Utf8): The name of the album artist for the track.
                 - 'master_metadata_track_name' (pl.Utf8): The name of the track.
         """
+        shared = self._get_shared_aggregate("daily_song_play_counts", year)
+        if shared is not None:
+            return shared
         return (
             self.get_cleaned_data(year)
             .lazy()
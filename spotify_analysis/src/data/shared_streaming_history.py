@@ -0,0 +1,415 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterable, Iterator, Mapping, Optional, Tuple
+from contextlib import contextmanager
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+import uuid
+import weakref
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import polars as pl
+
+from spotify_analysis.src.data.streaming_history import StreamingHistory
+
+# Bump whenever ``StreamingHistory.clean_data`` or the shared aggregates change,
+# so files published by an older deployment are never attached.
+SHARED_FORMAT_VERSION = 1
+
+CLEANED_DATA_NAME = "cleaned_data"
+MANIFEST_NAME = "manifest.json"
+REF_SUFFIX = ".ref"
+
+_KEY_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
+
+StreamingHistoryBuilder = Callable[[], Tuple[StreamingHistory, Mapping[str, pl.DataFrame]]]
+
+
+def get_dataset_key(data: bytes, aggregate_names: Iterable[str] = ()) -> str:
+    """
+    Returns a stable key for a dataset.
+
+    The key covers the raw export bytes, the shared format version and the
+    names of the aggregates published alongside the cleaned data.
+    """
+    digest = hashlib.sha256(f"v{SHARED_FORMAT_VERSION}\0".encode())
+    for name in sorted(aggregate_names):
+        digest.update(f"{name}\0".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def _validate_key(key: str) -> str:
+    # Keys become file names under the store root, so reject path separators.
+    if not _KEY_PATTERN.fullmatch(key):
+        raise ValueError(f"Invalid dataset key {key!r}.")
+    return key
+
+
+class SharedStreamingHistory(StreamingHistory):
+    """
+    A read-only ``StreamingHistory`` backed by memory-mapped Arrow IPC files.
+
+    Instances are created by ``SharedDatasetStore.attach`` and hold one
+    reference on the published dataset until ``release`` is called (or the
+    instance is garbage collected). The cleaned frame and any precomputed
+    aggregates are mapped rather than read, so every attached session or
+    process shares the same pages of memory.
+    """
+    def __init__(
+        self,
+        store: SharedDatasetStore,
+        key: str,
+        cleaned_data: pl.DataFrame,
+        aggregates: Dict[str, pl.DataFrame],
+        ref_path: Path,
+        ref_fd: int,
+    ) -> None:
+        super().__init__(zip_path=None)
+        self._cleaned_data = cleaned_data
+        self._aggregates = aggregates
+        self._key = key
+        # The attaching PID is recorded so a forked child that inherits this
+        # handle never drops the parent's reference.
+        self._finalizer = weakref.finalize(
+            self, store._release, key, ref_path, ref_fd, os.getpid(),
+        )
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def released(self) -> bool:
+        return not self._finalizer.alive
+
+    @property
+    def cleaned_data(self) -> pl.DataFrame:
+        if self.released:
+            raise ValueError("Shared streaming history has been released.")
+        return self._cleaned_data
+
+    @property
+    def aggregates(self) -> Dict[str, pl.DataFrame]:
+        if self.released:
+            raise ValueError("Shared streaming history has been released.")
+        return self._aggregates
+
+    def read_data(self) -> SharedStreamingHistory:
+        raise TypeError("Shared streaming history is read-only; it cannot be re-read.")
+
+    def clean_data(self) -> SharedStreamingHistory:
+        raise TypeError("Shared streaming history is read-only; it is already cleaned.")
+
+    def release(self) -> None:
+        """Drops this reference, removing the dataset once no references remain."""
+        self._cleaned_data = None
+        self._aggregates = {}
+        self._finalizer()
+
+    def __enter__(self) -> SharedStreamingHistory:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+class SharedDatasetStore:
+    """
+    Publishes cleaned streaming histories as Arrow IPC files for zero-copy sharing.
+
+    Each dataset lives in ``<root>/<key>/`` as one uncompressed ``.arrow`` file
+    per frame plus a manifest, alongside a ``refs/`` directory holding one
+    marker file per attached reader. Every reader holds an exclusive ``flock``
+    on its marker, so markers left behind by dead processes are recognised
+    (and pruned) regardless of PID reuse or PID namespaces. Publishing,
+    attaching and releasing are serialised per key by a lock file in the root,
+    and the dataset is removed when the last reference is released.
+
+    The root and everything under it is private to the current user. Requires
+    POSIX file locking.
+
+    Args:
+        root (Path, optional): Directory holding the published datasets.
+                               Defaults to a per-user directory in the system
+                               temporary directory. Use a tmpfs such as
+                               ``/dev/shm`` to keep the buffers in shared memory.
+    """
+    def __init__(self, root: Optional[Path] = None) -> None:
+        if fcntl is None:
+            raise OSError("SharedDatasetStore requires POSIX file locking (fcntl).")
+        if root is None:
+            root = Path(tempfile.gettempdir()) / f"spotify_analysis_shared-{os.getuid()}"
+        self._root = Path(root)
+        self._root.mkdir(mode=0o700, parents=True, exist_ok=True)
+        root_stat = os.lstat(self._root)
+        if (
+            not stat.S_ISDIR(root_stat.st_mode)
+            or root_stat.st_uid != os.getuid()
+            or root_stat.st_mode & 0o077
+        ):
+            raise PermissionError(
+                f"Shared dataset root {self._root} must be a directory owned by "
+                "the current user and inaccessible to others (mode 0o700)."
+            )
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def _dataset_dir(self, key: str) -> Path:
+        return self._root / _validate_key(key)
+
+    def _refs_dir(self, key: str) -> Path:
+        return self._dataset_dir(key) / "refs"
+
+    def _frame_path(self, key: str, name: str) -> Path:
+        return self._dataset_dir(key) / f"{name}.arrow"
+
+    def _lock_path(self, key: str) -> Path:
+        return self._root / f"{_validate_key(key)}.lock"
+
+    @contextmanager
+    def _locked(self, key: str) -> Iterator[None]:
+        # Lock files live outside the dataset directory, so removing a dataset
+        # never unlinks a lock another process is waiting on. ``prune`` may
+        # unlink an unused lock file, so after locking, check the file is still
+        # the one at the lock path and retry otherwise.
+        lock_path = self._lock_path(key)
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(lock_path)
+                except FileNotFoundError:
+                    continue
+                if os.path.samestat(os.fstat(fd), current):
+                    yield
+                    return
+            finally:
+                os.close(fd)
+
+    def _write_private(self, path: Path, write: Callable[[Any], None]) -> None:
+        # Write to a private temporary file and rename it into place, so
+        # readers never observe a partially written file.
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.replace(tmp_path, path)
+
+    def _read_manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            manifest = json.loads((self._dataset_dir(key) / MANIFEST_NAME).read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if manifest.get("version") != SHARED_FORMAT_VERSION:
+            return None
+        if not all(self._frame_path(key, name).exists() for name in manifest["frames"]):
+            return None
+        return manifest
+
+    def _publish(
+        self,
+        key: str,
+        stream_history: StreamingHistory,
+        aggregates: Optional[Mapping[str, pl.DataFrame]],
+    ) -> Dict[str, Any]:
+        # Drop any stale or partially written files before writing afresh.
+        self._remove(key)
+        frames = {CLEANED_DATA_NAME: stream_history.cleaned_data, **(aggregates or {})}
+        self._dataset_dir(key).mkdir(mode=0o700, exist_ok=True)
+        self._refs_dir(key).mkdir(mode=0o700, exist_ok=True)
+        for name, df in frames.items():
+            # Uncompressed, single-chunk IPC files can be memory-mapped without copying.
+            self._write_private(
+                self._frame_path(key, name),
+                lambda file, df=df: df.rechunk().write_ipc(file, compression="uncompressed"),
+            )
+        # The manifest is written last, as its presence marks the dataset as published.
+        manifest = {"version": SHARED_FORMAT_VERSION, "frames": sorted(frames)}
+        self._write_private(
+            self._dataset_dir(key) / MANIFEST_NAME,
+            lambda file: file.write(json.dumps(manifest).encode()),
+        )
+        return manifest
+
+    def is_published(self, key: str) -> bool:
+        with self._locked(key):
+            return self._read_manifest(key) is not None
+
+    def publish(
+        self,
+        key: str,
+        stream_history: StreamingHistory,
+        aggregates: Optional[Mapping[str, pl.DataFrame]] = None,
+    ) -> SharedDatasetStore:
+        """
+        Writes the cleaned data and aggregates of a streaming history to the store.
+
+        Publishing is idempotent: if the key is already published the existing
+        files are kept, so concurrent publishers of the same export do not
+        duplicate it. A published dataset with no references may be removed
+        by ``prune``; use ``attach`` with a builder to publish and reference
+        it atomically.
+
+        Args:
+            key (str): The dataset key, usually from ``get_dataset_key``.
+            stream_history (StreamingHistory): A streaming history whose data has been cleaned.
+            aggregates (Mapping[str, pl.DataFrame], optional): Precomputed frames to
+                                  publish alongside the cleaned data, by name.
+
+        Returns:
+            SharedDatasetStore: The store, to allow chaining into ``attach``.
+        """
+        with self._locked(key):
+            if self._read_manifest(key) is None:
+                self._publish(key, stream_history, aggregates)
+        return self
+
+    def attach(
+        self,
+        key: str,
+        build: Optional[StreamingHistoryBuilder] = None,
+    ) -> SharedStreamingHistory:
+        """
+        Memory-maps a published dataset and takes a reference on it.
+
+        Args:
+            key (str): The key the dataset was published under.
+            build (Callable, optional): Called to produce the cleaned streaming
+                                  history and its aggregates when the key is not
+                                  published; the result is published before
+                                  attaching. Runs while holding the key's lock,
+                                  so concurrent callers build the dataset once.
+
+        Returns:
+            SharedStreamingHistory: A read-only streaming history over the shared buffers.
+
+        Raises:
+            KeyError: If the key is not published and no ``build`` was given.
+        """
+        with self._locked(key):
+            manifest = self._read_manifest(key)
+            if manifest is None:
+                if build is None:
+                    raise KeyError(f"No dataset has been published under key {key!r}.")
+                stream_history, aggregates = build()
+                manifest = self._publish(key, stream_history, aggregates)
+
+            ref_path = self._refs_dir(key) / f"{uuid.uuid4().hex}{REF_SUFFIX}"
+            ref_fd = os.open(ref_path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o600)
+            fcntl.flock(ref_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            try:
+                frames = {
+                    name: pl.read_ipc(self._frame_path(key, name), memory_map=True, rechunk=False)
+                    for name in manifest["frames"]
+                }
+            except BaseException:
+                ref_path.unlink(missing_ok=True)
+                os.close(ref_fd)
+                raise
+        cleaned_data = frames.pop(CLEANED_DATA_NAME)
+        return SharedStreamingHistory(self, key, cleaned_data, frames, ref_path, ref_fd)
+
+    def _count_refs(self, key: str) -> int:
+        refs_dir = self._refs_dir(key)
+        if not refs_dir.exists():
+            return 0
+        count = 0
+        for ref_path in refs_dir.glob(f"*{REF_SUFFIX}"):
+            try:
+                fd = os.open(ref_path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                count += 1
+            else:
+                # Nobody holds the marker's lock, so its reader has died.
+                ref_path.unlink(missing_ok=True)
+            finally:
+                os.close(fd)
+        return count
+
+    def get_ref_count(self, key: str) -> int:
+        with self._locked(key):
+            return self._count_refs(key)
+
+    def prune(self) -> SharedDatasetStore:
+        """Removes every dataset without a live reference, e.g. after a crash."""
+        for dataset_dir in self._root.iterdir():
+            if not dataset_dir.is_dir() or not _KEY_PATTERN.fullmatch(dataset_dir.name):
+                continue
+            with self._locked(dataset_dir.name):
+                if self._count_refs(dataset_dir.name) == 0:
+                    self._remove(dataset_dir.name)
+        for lock_path in self._root.glob("*.lock"):
+            if _KEY_PATTERN.fullmatch(lock_path.stem):
+                self._remove_lock(lock_path.stem)
+        return self
+
+    def _remove_lock(self, key: str) -> None:
+        # Only unlink a lock nobody holds, and only once its dataset is gone,
+        # so an in-flight publish or attach is never affected.
+        lock_path = self._lock_path(key)
+        try:
+            fd = os.open(lock_path, os.O_RDWR)
+        except FileNotFoundError:
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return
+        try:
+            if not self._dataset_dir(key).exists():
+                lock_path.unlink(missing_ok=True)
+        finally:
+            os.close(fd)
+
+    def _release(self, key: str, ref_path: Path, ref_fd: int, owner_pid: int) -> None:
+        if os.getpid() != owner_pid:
+            # A forked child inherited this handle; the reference is the parent's.
+            os.close(ref_fd)
+            return
+        with self._locked(key):
+            ref_path.unlink(missing_ok=True)
+            os.close(ref_fd)
+            if self._count_refs(key) == 0:
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        # Must be called while holding the key's lock. Unlinking a mapped file
+        # is safe on POSIX; existing mappings stay valid until they are unmapped.
+        dataset_dir = self._dataset_dir(key)
+        if not dataset_dir.exists():
+            return
+        refs_dir = self._refs_dir(key)
+        for parent in (dataset_dir, refs_dir):
+            if not parent.exists():
+                continue
+            for path in parent.iterdir():
+                if path == refs_dir or (parent == refs_dir and path.suffix == REF_SUFFIX):
+                    continue
+                if path.is_dir() and not path.is_symlink():
+                    shutil.rmtree(path)
+                else:
+                    path.unlink(missing_ok=True)
+        if refs_dir.exists():
+            if any(refs_dir.glob(f"*{REF_SUFFIX}")):
+                # Live readers still hold markers; they keep the directory.
+                return
+            refs_dir.rmdir()
+        dataset_dir.rmdir()
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List
+from typing import Dict, List
 from pathlib import Path
 import zipfile
 
@@ -12,6 +12,7 @@ class StreamingHistory:
         self._zip_path = zip_path
         self._raw_data: pl.DataFrame = None
         self._cleaned_data: pl.DataFrame = None
+        self._aggregates: Dict[str, pl.DataFrame] = {}
 
     def read_data(self) -> StreamingHistory:
         dfs: List[pl.DataFrame] = []
@@ -89,4 +90,8 @@ class StreamingHistory:
         if self._cleaned_data is None:
             raise ValueError("Data has not been cleaned yet. Call clean_data() first.")
         return self._cleaned_data
-    
\ No newline at end of file
+    
+    @property
+    def aggregates(self) -> Dict[str, pl.DataFrame]:
+        """Precomputed all-years aggregates by name; empty unless loaded from a shared dataset."""
+        return self._aggregates
@@ -0,0 +1,201 @@
+from pathlib import Path
+import json
+import multiprocessing
+import os
+import zipfile
+
+import polars as pl
+import pytest
+
+from spotify_analysis.src.analysis.streaming_history_analyser import StreamingHistoryAnalyser
+from spotify_analysis.src.data._schema import streaming_history_audio_schema
+from spotify_analysis.src.data.shared_streaming_history import (
+    REF_SUFFIX,
+    SharedDatasetStore,
+    get_dataset_key,
+)
+from spotify_analysis.src.data.streaming_history import StreamingHistory
+
+KEY = "k"
+
+
+def _make_record(ts: str, track: str, artist: str) -> dict:
+    return {
+        **{column: None for column in streaming_history_audio_schema},
+        "ts": ts,
+        "ms_played": 200_000,
+        "spotify_track_uri": f"spotify:track:{track}",
+        "master_metadata_track_name": track,
+        "master_metadata_album_artist_name": artist,
+        "master_metadata_album_album_name": f"{artist} album",
+        "reason_end": "trackdone",
+        "shuffle": False,
+        "skipped": False,
+        "offline": False,
+        "offline_timestamp": 1,
+        "incognito_mode": False,
+    }
+
+
+def _build(zip_path: Path):
+    stream_history = StreamingHistory(zip_path).read_data().clean_data()
+    return stream_history, StreamingHistoryAnalyser(stream_history).get_shareable_aggregates()
+
+
+def _attach_and_release(root: Path, zip_path: Path, iterations: int) -> None:
+    store = SharedDatasetStore(root)
+    for _ in range(iterations):
+        with store.attach(KEY, lambda: _build(zip_path)) as shared:
+            assert shared.cleaned_data.height == 3
+            assert set(shared.aggregates) == set(StreamingHistoryAnalyser.SHAREABLE_AGGREGATES)
+
+
+@pytest.fixture
+def zip_path(tmp_path: Path) -> Path:
+    records = [
+        _make_record("2023-01-01T10:00:00Z", "a", "x"),
+        _make_record("2023-01-01T11:00:00Z", "b", "y"),
+        _make_record("2023-01-02T10:00:00Z", "a", "x"),
+    ]
+    path = tmp_path / "export.zip"
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        zip_ref.writestr(
+            "Spotify Extended Streaming History/Streaming_History_Audio_2023.json",
+            json.dumps(records),
+        )
+    return path
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> SharedDatasetStore:
+    return SharedDatasetStore(tmp_path / "shared")
+
+
+def test_round_trip(store: SharedDatasetStore, zip_path: Path) -> None:
+    stream_history, aggregates = _build(zip_path)
+    with store.publish(KEY, stream_history, aggregates).attach(KEY) as shared:
+        assert shared.cleaned_data.equals(stream_history.cleaned_data)
+        assert shared.aggregates.keys() == aggregates.keys()
+        for name, df in aggregates.items():
+            assert shared.aggregates[name].equals(df)
+        assert (
+            StreamingHistoryAnalyser(shared).get_top_artists()
+            .equals(StreamingHistoryAnalyser(stream_history).get_top_artists())
+        )
+
+
+def test_ref_count_and_cleanup(store: SharedDatasetStore, zip_path: Path) -> None:
+    first = store.attach(KEY, lambda: _build(zip_path))
+    second = store.attach(KEY)
+    assert store.get_ref_count(KEY) == 2
+
+    first.release()
+    assert first.released
+    assert store.get_ref_count(KEY) == 1
+    assert store.is_published(KEY)
+
+    second.release()
+    assert store.get_ref_count(KEY) == 0
+    assert not (store.root / KEY).exists()
+
+
+def test_abandoned_marker_is_pruned(store: SharedDatasetStore, zip_path: Path) -> None:
+    shared = store.attach(KEY, lambda: _build(zip_path))
+    refs_dir = store.root / KEY / "refs"
+    # A marker nobody holds a lock on, as left by a killed process.
+    (refs_dir / f"abandoned{REF_SUFFIX}").touch()
+    # Entries that are not markers are ignored.
+    (refs_dir / ".keep").touch()
+    assert store.get_ref_count(KEY) == 1
+    assert not (refs_dir / f"abandoned{REF_SUFFIX}").exists()
+
+    shared.release()
+    assert not (store.root / KEY).exists()
+
+
+def test_prune_removes_unreferenced_datasets(store: SharedDatasetStore, zip_path: Path) -> None:
+    store.publish(KEY, *_build(zip_path))
+    assert store.is_published(KEY)
+    store.prune()
+    assert not (store.root / KEY).exists()
+    assert not (store.root / f"{KEY}.lock").exists()
+
+
+def test_prune_keeps_referenced_datasets(store: SharedDatasetStore, zip_path: Path) -> None:
+    with store.attach(KEY, lambda: _build(zip_path)):
+        store.prune()
+        assert store.is_published(KEY)
+        assert (store.root / f"{KEY}.lock").exists()
+    store.prune()
+    assert list(store.root.iterdir()) == []
+
+
+def test_released_handle(store: SharedDatasetStore, zip_path: Path) -> None:
+    shared = store.attach(KEY, lambda: _build(zip_path))
+    shared.release()
+    with pytest.raises(ValueError, match="released"):
+        shared.cleaned_data
+    with pytest.raises(ValueError, match="released"):
+        shared.aggregates
+
+
+def test_attach_unknown_key(store: SharedDatasetStore) -> None:
+    with pytest.raises(KeyError):
+        store.attach(KEY)
+    assert store.get_ref_count(KEY) == 0
+
+
+def test_invalid_key(store: SharedDatasetStore) -> None:
+    with pytest.raises(ValueError):
+        store.attach("../escape")
+
+
+def test_dataset_key_covers_aggregates() -> None:
+    assert get_dataset_key(b"data") != get_dataset_key(b"data", ["daily_play_counts"])
+    assert get_dataset_key(b"data", ["a", "b"]) == get_dataset_key(b"data", ["b", "a"])
+
+
+def test_files_are_private(store: SharedDatasetStore, zip_path: Path) -> None:
+    with store.attach(KEY, lambda: _build(zip_path)):
+        assert store.root.stat().st_mode & 0o077 == 0
+        for path in (store.root / KEY).rglob("*"):
+            assert path.stat().st_mode & 0o077 == 0
+
+
+def test_rejects_shared_root(tmp_path: Path) -> None:
+    root = tmp_path / "shared"
+    root.mkdir()
+    os.chmod(root, 0o755)
+    with pytest.raises(PermissionError):
+        SharedDatasetStore(root)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="fork start method unavailable",
+)
+def test_forked_child_keeps_parent_reference(store: SharedDatasetStore, zip_path: Path) -> None:
+    with store.attach(KEY, lambda: _build(zip_path)) as shared:
+        process = multiprocessing.get_context("fork").Process(target=shared.release)
+        process.start()
+        process.join(timeout=60)
+        assert process.exitcode == 0
+        assert not shared.released
+        assert store.get_ref_count(KEY) == 1
+        assert store.is_published(KEY)
+    assert not (store.root / KEY).exists()
+
+
+def test_concurrent_attach_and_release(store: SharedDatasetStore, zip_path: Path) -> None:
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_attach_and_release, args=(store.root, zip_path, 10))
+        for _ in range(10)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=120)
+    assert [process.exitcode for process in processes] == [0] * len(processes)
+    assert store.get_ref_count(KEY) == 0
+    assert not (store.root / KEY).exists()